@@ -20,7 +20,8 @@ Environment variables required:
 Optional env vars:
 - OPENAI_EMBED_MODEL (default: text-embedding-3-small)
 - EMBED_BATCH_SIZE (default: 200)
-- EMBED_SLEEP (default: 0.01)
+- EMBED_MAX_BATCH_TOKENS (default: 250000)
+- EMBED_TOKENS_PER_MIN (default: 5000000, 0 disables client-side rate limiting)
 - EMBED_FETCH_SIZE (default: 1000)
 - MAX_RETRIES (default: 3)
 
@@ -30,10 +31,19 @@ Usage:
 """
 
 import os
+import io
+import re
+import struct
 import sys
 import time
+import copy
 import json
+import pickle
+import queue
+import tempfile
+import threading
 import argparse
+from collections import defaultdict
 from typing import List, Dict, Tuple, Optional
 from pathlib import Path
 
@@ -50,6 +60,51 @@ except Exception:
     import openai
     _OPENAI_STYLE = "module"
 
+# httpx is optional: used to give the OpenAI client a pooled HTTP/2 transport
+try:
+    import httpx
+    _HAS_HTTPX = True
+except Exception:
+    _HAS_HTTPX = False
+
+# tiktoken is optional: fall back to a rough chars/4 estimate if unavailable
+try:
+    import tiktoken
+    _HAS_TIKTOKEN = True
+except Exception:
+    _HAS_TIKTOKEN = False
+
+# numpy is optional: vectorizes per-float work on the embed/write paths
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except Exception:
+    _HAS_NUMPY = False
+
+# orjson is optional: C-level JSON for the checkpoint fallback
+try:
+    import orjson
+    _HAS_ORJSON = True
+except Exception:
+    _HAS_ORJSON = False
+
+# pybloom_live is optional: checkpoint falls back to the JSON list without it
+try:
+    from pybloom_live import ScalableBloomFilter
+    _HAS_BLOOM = True
+except Exception:
+    _HAS_BLOOM = False
+
+# OpenAI hard cap on inputs per embeddings request
+OPENAI_MAX_BATCH_INPUTS = 2048
+
+# Full backfills above this many rows read via binary COPY instead of a cursor
+COPY_READ_THRESHOLD = 100_000
+
+# Cap on unique vectors kept for cross-batch dedup; on a mostly-unique
+# multi-million-row table an unbounded cache would grow to tens of GB
+DEDUP_CACHE_MAX = 50_000
+
 # Default text columns per table
 DEFAULTS: Dict[str, List[str]] = {
     "product_master": ["description", "code", "range", "group", "subgroup", "manufacturer"],
@@ -70,14 +125,35 @@ def env_int(name: str, default: int) -> int:
     except Exception:
         return default
 
-def env_float(name: str, default: float) -> float:
-    v = os.environ.get(name, "").strip()
-    if not v:
-        return default
+def get_token_counter(model: str):
+    """
+    Return a callable text -> token count for the given embedding model.
+    Uses tiktoken when available; otherwise a rough ~4 chars/token estimate.
+    """
+    if _HAS_TIKTOKEN:
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except Exception:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(enc.encode(text))
+    return lambda text: max(1, len(text) // 4)
+
+def build_http_client():
+    """
+    Pooled httpx client for the OpenAI SDK. With HTTP/2 a single TCP+TLS
+    connection multiplexes concurrent batch requests, so we pay one
+    handshake per job instead of one per request. Falls back to HTTP/1.1
+    keep-alive when the h2 extra is not installed, and to the SDK default
+    when httpx itself is missing.
+    """
+    if not _HAS_HTTPX:
+        return None
+    limits = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+    timeout = httpx.Timeout(60.0, connect=5.0)
     try:
-        return float(v)
-    except Exception:
-        return default
+        return httpx.Client(http2=True, limits=limits, timeout=timeout)
+    except ImportError:
+        return httpx.Client(limits=limits, timeout=timeout)
 
 def connect_db() -> psycopg2.extensions.connection:
     """
@@ -95,32 +171,46 @@ def connect_db() -> psycopg2.extensions.connection:
     password = os.environ["PGPASSWORD"]
     return psycopg2.connect(host=host, port=port, dbname=dbname, user=user, password=password)
 
-def table_columns(conn, schema: str, table: str) -> List[str]:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema=%s AND table_name=%s
-            ORDER BY ordinal_position
-            """,
-            (schema, table),
-        )
-        return [r[0] for r in cur.fetchall()]
-
-def all_text_columns(conn, schema: str, table: str) -> List[str]:
+def fetch_table_metadata(conn, schema: str, table: str) -> dict:
+    """
+    Fetch all schema metadata in one round-trip: every column (name,
+    udt_name, data_type, in ordinal order) plus the primary key column,
+    packed server-side with json_build_object. Replaces four separate
+    information_schema queries at startup.
+    """
     with conn.cursor() as cur:
         cur.execute(
             """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema=%s AND table_name=%s
-              AND data_type IN ('text','character varying')
-            ORDER BY ordinal_position
+            SELECT json_build_object(
+                'cols', (
+                    SELECT json_agg(json_build_object(
+                               'name', column_name,
+                               'udt', udt_name,
+                               'data_type', data_type)
+                           ORDER BY ordinal_position)
+                    FROM information_schema.columns
+                    WHERE table_schema=%s AND table_name=%s
+                ),
+                'pk', (
+                    SELECT kcu.column_name
+                    FROM information_schema.table_constraints tc
+                    JOIN information_schema.key_column_usage kcu
+                      ON tc.constraint_name = kcu.constraint_name
+                     AND tc.table_schema = kcu.table_schema
+                    WHERE tc.constraint_type = 'PRIMARY KEY'
+                      AND tc.table_schema = %s
+                      AND tc.table_name = %s
+                    ORDER BY kcu.ordinal_position
+                    LIMIT 1
+                )
+            )
             """,
-            (schema, table),
+            (schema, table, schema, table),
         )
-        return [r[0] for r in cur.fetchall()]
+        meta = cur.fetchone()[0]
+    if not meta.get("cols"):
+        raise RuntimeError(f"Table {schema}.{table} not found or has no columns")
+    return meta
 
 def existing_subset(all_cols: List[str], preferred: List[str]) -> List[str]:
     lower_map = {c.lower(): c for c in all_cols}
@@ -131,51 +221,34 @@ def existing_subset(all_cols: List[str], preferred: List[str]) -> List[str]:
             picked.append(c)
     return picked
 
-def detect_text_columns(conn, schema: str, table: str) -> List[str]:
-    cols = table_columns(conn, schema, table)
+def detect_text_columns(meta: dict, table: str) -> List[str]:
+    cols = [c["name"] for c in meta["cols"]]
 
     if table in DEFAULTS:
         picked = existing_subset(cols, DEFAULTS[table])
         if picked:
             return picked
 
-    picked = all_text_columns(conn, schema, table)
+    picked = [c["name"] for c in meta["cols"] if c["data_type"] in ("text", "character varying")]
     if picked:
         return picked
 
-    raise RuntimeError(f"No text/varchar columns found for {schema}.{table}")
+    raise RuntimeError(f"No text/varchar columns found for {table}")
 
-def find_pk(conn, schema: str, table: str) -> str:
+def find_pk(meta: dict, schema: str, table: str) -> str:
     """Find the primary key column."""
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT kcu.column_name
-            FROM information_schema.table_constraints tc
-            JOIN information_schema.key_column_usage kcu
-              ON tc.constraint_name = kcu.constraint_name
-             AND tc.table_schema = kcu.table_schema
-            WHERE tc.constraint_type = 'PRIMARY KEY'
-              AND tc.table_schema = %s
-              AND tc.table_name = %s
-            ORDER BY kcu.ordinal_position
-            """,
-            (schema, table),
-        )
-        row = cur.fetchone()
-        if row and row[0]:
-            return row[0]
+    if meta.get("pk"):
+        return meta["pk"]
 
-    cols = table_columns(conn, schema, table)
-    if any(c.lower() == "id" for c in cols):
-        return next(c for c in cols if c.lower() == "id")
+    for c in meta["cols"]:
+        if c["name"].lower() == "id":
+            return c["name"]
 
     raise RuntimeError(f"Could not detect primary key for {schema}.{table}")
 
-def detect_embedding_col(conn, schema: str, table: str) -> str:
+def detect_embedding_col(meta: dict, schema: str, table: str) -> str:
     """Find embedding column."""
-    cols = table_columns(conn, schema, table)
-    lower = {c.lower(): c for c in cols}
+    lower = {c["name"].lower(): c["name"] for c in meta["cols"]}
     for cand in ["embedding", "embeddings", "vector"]:
         if cand in lower:
             return lower[cand]
@@ -192,6 +265,12 @@ def count_remaining_rows(conn, schema: str, table: str, embedding_col: str) -> i
         cur.execute(q)
         return int(cur.fetchone()[0])
 
+def text_concat_sql(text_cols: List[str]) -> sql.SQL:
+    """concat_ws argument list: NULLIF(trim(col::text), '') per column."""
+    return sql.SQL(", ").join(
+        sql.SQL("NULLIF(trim({}::text), '')").format(sql.Identifier(c)) for c in text_cols
+    )
+
 def stream_rows(
     conn,
     schema: str,
@@ -205,21 +284,34 @@ def stream_rows(
 ):
     """
     Yield (pk_value, concatenated_text) for rows where embedding is NULL.
+    Concatenation happens server-side via concat_ws so Python receives one
+    prebuilt text per row instead of N separate columns.
     Skip rows in skip_processed set if provided (for resume).
     """
     if skip_processed is None:
         skip_processed = set()
 
-    q = sql.SQL("SELECT {pk}, {cols} FROM {tbl} WHERE {emb} IS NULL ORDER BY {pk}").format(
+    cols_sql = text_concat_sql(text_cols)
+    # Rows whose columns are all NULL/empty would concatenate to '' and
+    # waste an API input -- filter them server-side so they never stream.
+    q = sql.SQL(
+        "SELECT {pk}, concat_ws(' | ', {cols}) AS txt FROM {tbl} "
+        "WHERE {emb} IS NULL AND concat_ws(' | ', {cols}) <> '' ORDER BY {pk}"
+    ).format(
         pk=sql.Identifier(pk),
-        cols=sql.SQL(", ").join(sql.Identifier(c) for c in text_cols),
+        cols=cols_sql,
         tbl=sql.Identifier(schema, table),
         emb=sql.Identifier(embedding_col),
     )
     if max_rows > 0:
         q = sql.SQL("{} LIMIT {}").format(q, sql.Literal(max_rows))
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    # Named (server-side) cursor so Postgres streams rows instead of the
+    # driver materializing the full result set; default tuple factory so
+    # there is no per-row DictRow construction on the hot path.
+    # Column order is fixed by the SELECT: (pk, txt).
+    cur = conn.cursor(name=f"embed_stream_{table}")
+    cur.itersize = fetch_size
     cur.execute(q)
 
     while True:
@@ -228,37 +320,172 @@ def stream_rows(
             break
 
         for row in rows:
-            rid = row[pk]
-            
+            rid = row[0]
+
             # Skip if already processed
             if rid in skip_processed:
                 continue
 
-            parts: List[str] = []
-            for c in text_cols:
-                val = row[c]
-                if val is None:
-                    continue
-                s = str(val).strip()
-                if s:
-                    parts.append(s)
-            yield rid, " | ".join(parts)
+            yield rid, row[1]
 
     cur.close()
 
-def embed_batch_with_retry(client, model: str, texts: List[str], max_retries: int = 3) -> List[List[float]]:
+def stream_rows_copy(
+    conn,
+    schema: str,
+    table: str,
+    pk: str,
+    pk_type: str,
+    text_cols: List[str],
+    embedding_col: str,
+    skip_processed=None,
+):
+    """
+    Fast read path for full backfills: COPY ... TO STDOUT (FORMAT BINARY)
+    bypasses libpq's per-row text-protocol parsing. Yields (pk_value,
+    concatenated_text) like stream_rows. Integer pks are decoded from
+    their binary form; any other pk type is shipped as ::text. The
+    stream spools through a temp file so memory stays bounded.
+    """
+    if skip_processed is None:
+        skip_processed = set()
+
+    int_size = {"int2": 2, "int4": 4, "int8": 8}.get(pk_type)
+    pk_expr = (
+        sql.Identifier(pk)
+        if int_size
+        else sql.SQL("{}::text").format(sql.Identifier(pk))
+    )
+    cols_sql = text_concat_sql(text_cols)
+    q = sql.SQL(
+        "COPY (SELECT {pk_expr}, concat_ws(' | ', {cols}) FROM {tbl} "
+        "WHERE {emb} IS NULL AND concat_ws(' | ', {cols}) <> '' ORDER BY {pk}) "
+        "TO STDOUT (FORMAT BINARY)"
+    ).format(
+        pk_expr=pk_expr,
+        pk=sql.Identifier(pk),
+        cols=cols_sql,
+        tbl=sql.Identifier(schema, table),
+        emb=sql.Identifier(embedding_col),
+    )
+
+    with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as buf:
+        with conn.cursor() as cur:
+            cur.copy_expert(q.as_string(conn), buf)
+        buf.seek(0)
+        read = buf.read
+
+        # 11-byte signature, int32 flags, int32 header-extension length
+        header = read(19)
+        (ext_len,) = struct.unpack("!i", header[15:19])
+        if ext_len:
+            read(ext_len)
+
+        unpack_h = struct.Struct("!h").unpack
+        unpack_i = struct.Struct("!i").unpack
+        while True:
+            (nfields,) = unpack_h(read(2))
+            if nfields == -1:  # trailer
+                break
+            (id_len,) = unpack_i(read(4))
+            id_bytes = read(id_len)
+            rid = (
+                int.from_bytes(id_bytes, "big", signed=True)
+                if int_size
+                else id_bytes.decode("utf-8")
+            )
+            (txt_len,) = unpack_i(read(4))
+            text = read(txt_len).decode("utf-8")
+
+            if rid in skip_processed:
+                continue
+
+            yield rid, text
+
+class TokenBucket:
+    """
+    Client-side tokens-per-minute rate limiter for the embeddings API.
+    consume() blocks until capacity is available; penalize() empties the
+    bucket until a server-reported reset time (used on HTTP 429).
+    """
+
+    def __init__(self, tokens_per_min: int, burst: Optional[int] = None):
+        self.rate = tokens_per_min / 60.0
+        self.capacity = float(burst if burst is not None else tokens_per_min)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.level = min(self.capacity, self.level + elapsed * self.rate)
+            self.updated = now
+        return now
+
+    def consume(self, tokens: int):
+        """Block until the bucket holds `tokens`, then remove them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            self._refill()
+            if self.level >= tokens:
+                self.level -= tokens
+                return
+            wait = (tokens - self.level) / self.rate
+            time.sleep(min(wait, 5.0))
+
+    def penalize(self, reset_seconds: float):
+        """Empty the bucket and hold it empty until reset_seconds from now."""
+        self.level = 0.0
+        self.updated = time.monotonic() + max(0.0, reset_seconds)
+
+def parse_ratelimit_reset(value: str) -> Optional[float]:
+    """Parse OpenAI x-ratelimit-reset-* values like '1s', '250ms', '1m30s'."""
+    if not value:
+        return None
+    total = 0.0
+    for num, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value):
+        total += float(num) * {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}[unit]
+    return total or None
+
+def embed_batch_with_retry(
+    client,
+    model: str,
+    texts: List[str],
+    max_retries: int = 3,
+    bucket: Optional[TokenBucket] = None,
+    on_throttle=None,
+) -> List[List[float]]:
     """
     Call OpenAI embedding API with exponential backoff retry logic.
+    On 429 the rate-limit bucket (if any) is drained until the
+    server-reported reset time instead of blind exponential waiting;
+    on_throttle (if given) is invoked on every 429/timeout so the caller
+    can shrink its batch size.
     """
     for attempt in range(max_retries):
         try:
             if _OPENAI_STYLE == "client":
                 res = client.embeddings.create(model=model, input=texts)
-                return [d.embedding for d in res.data]
+                vectors = [d.embedding for d in res.data]
             else:
                 res = openai.Embedding.create(model=model, input=texts)
-                return [d["embedding"] for d in res["data"]]
+                vectors = [d["embedding"] for d in res["data"]]
+            if _HAS_NUMPY:
+                # float32 arrays halve memory vs Python float lists and
+                # serialize to the COPY stream without per-float packing
+                return [np.asarray(v, dtype=np.float32) for v in vectors]
+            return vectors
         except Exception as e:
+            response = getattr(e, "response", None)
+            status = getattr(response, "status_code", None) or getattr(e, "status_code", None)
+            throttled = status == 429 or "timeout" in type(e).__name__.lower()
+            if status == 429 and bucket is not None:
+                headers = getattr(response, "headers", None) or {}
+                reset = parse_ratelimit_reset(headers.get("x-ratelimit-reset-tokens", ""))
+                bucket.penalize(reset if reset is not None else 2 ** attempt)
+            if throttled and on_throttle is not None:
+                on_throttle()
             if attempt < max_retries - 1:
                 wait = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
                 print(f"⚠️  API error (attempt {attempt+1}/{max_retries}): {e}. Retrying in {wait}s...", flush=True)
@@ -283,6 +510,68 @@ def print_progress(processed: int, total: int, start_time: float, failed: int =
     else:
         print(f"✅ Processed: {processed:,} | ❌ Failed: {failed:,} | ⚡ Rate: {rate:.2f} rows/s", flush=True)
 
+def column_udt_name(meta: dict, schema: str, table: str, column: str) -> str:
+    """Return the udt_name (e.g. int8, text, uuid, vector) for a column."""
+    for c in meta["cols"]:
+        if c["name"] == column:
+            return c["udt"]
+    raise RuntimeError(f"Column {column} not found on {schema}.{table}")
+
+def ensure_staging_table(conn, schema: str, table: str, dim: int, emb_type: str = "vector") -> Optional[str]:
+    """
+    Create (or recreate) an unlogged staging table for bulk vector loads,
+    typed to match the target column (vector or halfvec). Returns the
+    staging table name, or None if it can't be created (no CREATE
+    privilege, pgvector missing, ...) so callers can fall back to
+    per-row UPDATEs.
+    """
+    stage = f"_embed_stage_{table}"
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {st}").format(
+                st=sql.Identifier(schema, stage)))
+            cur.execute(sql.SQL(
+                "CREATE UNLOGGED TABLE {st} (id text PRIMARY KEY, emb {typ}({dim}))"
+            ).format(
+                st=sql.Identifier(schema, stage),
+                typ=sql.Identifier(emb_type),
+                dim=sql.Literal(dim),
+            ))
+        conn.commit()
+        return stage
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️  Could not create staging table ({e}); falling back to per-row UPDATEs", flush=True)
+        return None
+
+def build_vector_copy_buffer(ids: List, vectors: List[List[float]], fp16: bool = False) -> io.BytesIO:
+    """
+    Build a PostgreSQL binary COPY stream of (id::text, emb) tuples.
+    pgvector's binary field format is: uint16 dim, uint16 unused, then
+    dim big-endian lanes -- float32 for vector (~4 bytes/float vs ~18 as
+    decimal text), float16 for halfvec (2 bytes/float).
+    """
+    lane = "e" if fp16 else "f"
+    np_dtype = ">f2" if fp16 else ">f4"
+    buf = io.BytesIO()
+    buf.write(b"PGCOPY\n\xff\r\n\x00")        # signature
+    buf.write(struct.pack("!ii", 0, 0))       # flags + header extension
+    for rid, vec in zip(ids, vectors):
+        id_bytes = str(rid).encode("utf-8")
+        buf.write(struct.pack("!h", 2))       # field count
+        buf.write(struct.pack("!i", len(id_bytes)))
+        buf.write(id_bytes)
+        if _HAS_NUMPY:
+            # One C-level cast+byteswap per vector instead of 1536 packs
+            vec_bytes = struct.pack("!HH", len(vec), 0) + np.asarray(vec, dtype=np_dtype).tobytes()
+        else:
+            vec_bytes = struct.pack(f"!HH{len(vec)}{lane}", len(vec), 0, *vec)
+        buf.write(struct.pack("!i", len(vec_bytes)))
+        buf.write(vec_bytes)
+    buf.write(struct.pack("!h", -1))          # trailer
+    buf.seek(0)
+    return buf
+
 def update_embeddings(
     conn,
     schema: str,
@@ -291,49 +580,147 @@ def update_embeddings(
     embedding_col: str,
     ids: List,
     vectors: List[List[float]],
+    stage: Optional[str] = None,
+    pk_type: str = "text",
+    fp16: bool = False,
 ):
-    """Update embeddings using executemany for speed."""
+    """
+    Write a batch of embeddings. With a staging table: one binary COPY +
+    one set-based UPDATE ... FROM. Without: per-row executemany fallback.
+    fp16=True packs halfvec lanes (halves the bytes on the wire).
+    """
     with conn.cursor() as cur:
-        q = sql.SQL("UPDATE {tbl} SET {emb} = %s WHERE {pk} = %s").format(
-            tbl=sql.Identifier(schema, table),
-            emb=sql.Identifier(embedding_col),
-            pk=sql.Identifier(pk),
-        )
-        params = [(vec, rid) for rid, vec in zip(ids, vectors)]
-        psycopg2.extras.execute_batch(cur, q.as_string(conn), params, page_size=200)
+        if stage:
+            copy_q = sql.SQL("COPY {st} (id, emb) FROM STDIN WITH (FORMAT BINARY)").format(
+                st=sql.Identifier(schema, stage))
+            cur.copy_expert(copy_q.as_string(conn), build_vector_copy_buffer(ids, vectors, fp16=fp16))
+            cur.execute(sql.SQL(
+                "UPDATE {tbl} t SET {emb} = s.emb FROM {st} s WHERE t.{pk} = s.id::{pk_type}"
+            ).format(
+                tbl=sql.Identifier(schema, table),
+                emb=sql.Identifier(embedding_col),
+                st=sql.Identifier(schema, stage),
+                pk=sql.Identifier(pk),
+                pk_type=sql.Identifier(pk_type),
+            ))
+            cur.execute(sql.SQL("TRUNCATE {st}").format(st=sql.Identifier(schema, stage)))
+        else:
+            q = sql.SQL("UPDATE {tbl} SET {emb} = %s WHERE {pk} = %s").format(
+                tbl=sql.Identifier(schema, table),
+                emb=sql.Identifier(embedding_col),
+                pk=sql.Identifier(pk),
+            )
+            # psycopg2 can't adapt numpy arrays; hand it plain lists
+            params = [
+                (vec.tolist() if hasattr(vec, "tolist") else vec, rid)
+                for rid, vec in zip(ids, vectors)
+            ]
+            psycopg2.extras.execute_batch(cur, q.as_string(conn), params, page_size=200)
     conn.commit()
 
 class CheckpointManager:
-    """Manage checkpoint file for resume capability."""
-    
+    """
+    Manage checkpoint state for resume capability.
+
+    With pybloom_live installed, processed ids live in a scalable Bloom
+    filter pickled to disk: membership checks stay constant-time and the
+    file stays MBs instead of GBs on multi-million-row tables. A false
+    positive (bounded at 1e-6) only skips a row that would have been
+    re-embedded harmlessly. Without pybloom_live, falls back to the
+    original JSON list + set. Writes are atomic (tmp file + os.replace +
+    fsync) and happen on a dedicated writer thread so the batch loop
+    never blocks on disk; call flush() to wait for queued writes.
+    """
+
     def __init__(self, table: str):
-        self.checkpoint_file = Path(f".embedding_checkpoint_{table}.json")
+        self.use_bloom = _HAS_BLOOM
+        suffix = "bloom" if self.use_bloom else "json"
+        self.checkpoint_file = Path(f".embedding_checkpoint_{table}.{suffix}")
         self.data = self._load()
-    
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._drain, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._apply_and_write(*item)
+            except Exception as e:
+                print(f"⚠️  Checkpoint write failed: {e}", flush=True)
+            finally:
+                self._queue.task_done()
+
+    def _empty(self) -> dict:
+        if self.use_bloom:
+            return {
+                "processed": ScalableBloomFilter(initial_capacity=100_000, error_rate=1e-6),
+                "failed": [],
+            }
+        return {"processed": [], "failed": []}
+
     def _load(self) -> dict:
         if self.checkpoint_file.exists():
             try:
+                if self.use_bloom:
+                    with open(self.checkpoint_file, "rb") as f:
+                        return pickle.load(f)
                 with open(self.checkpoint_file) as f:
                     return json.load(f)
             except Exception:
-                return {"processed": [], "failed": []}
-        return {"processed": [], "failed": []}
-    
+                return self._empty()
+        return self._empty()
+
     def save(self, processed_ids: List, failed_ids: List = None):
-        """Save checkpoint to disk."""
-        self.data["processed"].extend(processed_ids)
+        """Queue a checkpoint update; the writer thread persists it."""
+        self._queue.put((list(processed_ids), list(failed_ids) if failed_ids else None))
+
+    def flush(self):
+        """Block until every queued checkpoint write has hit disk."""
+        self._queue.join()
+
+    def _apply_and_write(self, processed_ids: List, failed_ids: Optional[List]):
+        if self.use_bloom:
+            for rid in processed_ids:
+                self.data["processed"].add(rid)
+        else:
+            self.data["processed"].extend(processed_ids)
         if failed_ids:
             self.data["failed"].extend(failed_ids)
-        
-        with open(self.checkpoint_file, "w") as f:
-            json.dump(self.data, f)
-    
-    def get_processed_ids(self) -> set:
-        """Return set of already processed IDs."""
+
+        tmp = self.checkpoint_file.with_suffix(self.checkpoint_file.suffix + ".tmp")
+        if self.use_bloom:
+            with open(tmp, "wb") as f:
+                pickle.dump(self.data, f)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with open(tmp, "wb") as f:
+                if _HAS_ORJSON:
+                    f.write(orjson.dumps(self.data))
+                else:
+                    f.write(json.dumps(self.data).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_file)
+
+    def get_processed_ids(self):
+        """
+        Return a membership container (`in`-checkable) of processed ids.
+
+        Always a snapshot: the db-reader thread probes it while the writer
+        thread keeps add()ing to the live filter, and ScalableBloomFilter
+        is not safe to mutate during membership checks.
+        """
+        if self.use_bloom:
+            return copy.deepcopy(self.data["processed"])
         return set(self.data.get("processed", []))
-    
+
     def clear(self):
-        """Delete checkpoint file."""
+        """Delete checkpoint file (after draining pending writes)."""
+        self.flush()
         if self.checkpoint_file.exists():
             self.checkpoint_file.unlink()
 
@@ -343,7 +730,18 @@ def main():
     parser.add_argument("--schema", default="public", help="Schema name (default: public)")
     parser.add_argument("--model", default=os.environ.get("OPENAI_EMBED_MODEL", "text-embedding-3-small"))
     parser.add_argument("--batch-size", type=int, default=env_int("EMBED_BATCH_SIZE", 200))
-    parser.add_argument("--sleep", type=float, default=env_float("EMBED_SLEEP", 0.01))
+    parser.add_argument(
+        "--max-batch-tokens",
+        type=int,
+        default=env_int("EMBED_MAX_BATCH_TOKENS", 250_000),
+        help="Token budget per embeddings request (default: 250000)",
+    )
+    parser.add_argument(
+        "--tokens-per-min",
+        type=int,
+        default=env_int("EMBED_TOKENS_PER_MIN", 5_000_000),
+        help="Client-side TPM budget matching the OpenAI tier (0 = no rate limiting)",
+    )
     parser.add_argument("--max-rows", type=int, default=0, help="Limit rows (0 = no limit)")
     parser.add_argument("--fetch-size", type=int, default=env_int("EMBED_FETCH_SIZE", 1000))
     parser.add_argument("--progress-interval", type=int, default=10, help="Print progress every N batches")
@@ -357,7 +755,12 @@ def main():
         raise RuntimeError("Missing OPENAI_API_KEY")
 
     if _OPENAI_STYLE == "client":
-        client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        # max_retries=0: embed_batch_with_retry owns the retry policy
+        client = OpenAI(
+            api_key=os.environ["OPENAI_API_KEY"],
+            max_retries=0,
+            http_client=build_http_client(),
+        )
     else:
         openai.api_key = os.environ["OPENAI_API_KEY"]
         client = None
@@ -376,83 +779,216 @@ def main():
     if skip_processed:
         print(f"📂 Resuming: skipping {len(skip_processed):,} already processed rows")
 
-    conn = connect_db()
+    # Two connections: a read-only one feeding the long-lived streaming
+    # cursor and a second for the frequently-committing write path, so
+    # commits never serialize against reads on one libpq socket.
+    conn_read = connect_db()
+    conn_read.set_session(readonly=True)
+    conn_write = connect_db()
     try:
-        pk = find_pk(conn, schema, table)
-        embedding_col = detect_embedding_col(conn, schema, table)
-        text_cols = detect_text_columns(conn, schema, table)
-
-        total = count_remaining_rows(conn, schema, table, embedding_col)
+        meta = fetch_table_metadata(conn_read, schema, table)
+        pk = find_pk(meta, schema, table)
+        pk_type = column_udt_name(meta, schema, table, pk)
+        embedding_col = detect_embedding_col(meta, schema, table)
+        emb_type = column_udt_name(meta, schema, table, embedding_col)
+        emb_fp16 = emb_type == "halfvec"
+        text_cols = detect_text_columns(meta, table)
+
+        total = count_remaining_rows(conn_read, schema, table, embedding_col)
         if args.max_rows > 0:
             total = min(total, args.max_rows)
 
         print(f"🎯 Target: {schema}.{table}")
-        print(f"🔑 PK: {pk} | Embedding column: {embedding_col}")
+        print(f"🔑 PK: {pk} | Embedding column: {embedding_col} ({emb_type})")
         print(f"📝 Text columns: {text_cols}")
         print(f"📊 Rows remaining: {total:,}")
-        print(f"🤖 Model: {args.model} | Batch: {args.batch_size} | Sleep: {args.sleep}s | Retries: {args.max_retries}")
+        print(f"🤖 Model: {args.model} | Token budget: {args.max_batch_tokens:,} | TPM limit: {args.tokens_per_min:,} | Retries: {args.max_retries}")
         print("─" * 80, flush=True)
 
+        count_tokens = get_token_counter(args.model)
+        bucket = TokenBucket(args.tokens_per_min) if args.tokens_per_min > 0 else None
+
+        # Staging table is created lazily once the vector dimension is known
+        # (first successful batch); None means the per-row UPDATE fallback.
+        stage_state = {"stage": None, "tried": False}
+
+        # AIMD controller for unique inputs per request: additive increase
+        # on success, multiplicative decrease on 429/timeout.
+        aimd = {"size": min(args.batch_size, OPENAI_MAX_BATCH_INPUTS)}
+        aimd_min, aimd_step = 16, 16
+
+        def on_throttle():
+            aimd["size"] = max(aimd_min, aimd["size"] // 2)
+
         start = time.time()
         processed = 0
         failed = 0
         batch_num = 0
 
-        batch_ids: List = []
-        batch_texts: List[str] = []
-
-        for rid, text in stream_rows(
-            conn,
-            schema,
-            table,
-            pk,
-            text_cols,
-            embedding_col,
-            args.max_rows,
-            args.fetch_size,
-            skip_processed,
-        ):
-            batch_ids.append(rid)
-            batch_texts.append(text)
-
-            if len(batch_ids) >= args.batch_size:
-                batch_num += 1
-                try:
-                    vectors = embed_batch_with_retry(client, args.model, batch_texts, args.max_retries)
-                    update_embeddings(conn, schema, table, pk, embedding_col, batch_ids, vectors)
-                    processed += len(batch_ids)
-                    
-                    # Save checkpoint every 10 batches
-                    if batch_num % 10 == 0:
-                        checkpoint.save(batch_ids)
-                    
-                except Exception as e:
-                    failed += len(batch_ids)
-                    print(f"❌ Batch {batch_num} failed after {args.max_retries} retries: {e}", flush=True)
-                    checkpoint.save([], batch_ids)  # Save failed IDs
-
-                batch_ids, batch_texts = [], []
-
-                if batch_num % args.progress_interval == 0:
-                    print_progress(processed, total, start, failed)
-
-                if args.sleep > 0:
-                    time.sleep(args.sleep)
-
-        # Flush remainder
-        if batch_ids:
+        # Deduplicate identical texts: embed each unique string once per run
+        # and broadcast the vector to every row that shares it.
+        text_to_vec: Dict[str, List[float]] = {}
+        text_to_ids: Dict[str, List] = defaultdict(list)
+
+        pending_texts: List[str] = []  # unique texts awaiting embedding
+        pending_tokens = 0
+        rows_buffered = 0
+        deduped = 0
+        unique_embedded = 0
+
+        def flush_batch():
+            """Embed pending unique texts and write vectors for all buffered rows."""
+            nonlocal pending_texts, pending_tokens
+            nonlocal rows_buffered, processed, failed, batch_num, unique_embedded
+            if not text_to_ids:
+                return
             batch_num += 1
+            all_ids = [rid for text_ids in text_to_ids.values() for rid in text_ids]
             try:
-                vectors = embed_batch_with_retry(client, args.model, batch_texts, args.max_retries)
-                update_embeddings(conn, schema, table, pk, embedding_col, batch_ids, vectors)
-                processed += len(batch_ids)
-                checkpoint.save(batch_ids)
+                if pending_texts:
+                    if bucket is not None:
+                        bucket.consume(pending_tokens)
+                    vectors = embed_batch_with_retry(
+                        client, args.model, pending_texts, args.max_retries,
+                        bucket=bucket, on_throttle=on_throttle,
+                    )
+                    text_to_vec.update(zip(pending_texts, vectors))
+                    unique_embedded += len(vectors)
+                    aimd["size"] = min(OPENAI_MAX_BATCH_INPUTS, aimd["size"] + aimd_step)
+
+                # Expand unique vectors back to one (id, vec) pair per row
+                ids: List = []
+                vecs: List[List[float]] = []
+                for text, text_ids in text_to_ids.items():
+                    vec = text_to_vec[text]
+                    for rid in text_ids:
+                        ids.append(rid)
+                        vecs.append(vec)
+                if not stage_state["tried"]:
+                    stage_state["stage"] = ensure_staging_table(
+                        conn_write, schema, table, len(vecs[0]),
+                        emb_type=emb_type if emb_fp16 else "vector",
+                    )
+                    stage_state["tried"] = True
+                update_embeddings(
+                    conn_write, schema, table, pk, embedding_col, ids, vecs,
+                    stage=stage_state["stage"], pk_type=pk_type, fp16=emb_fp16,
+                )
+                processed += len(ids)
+
+                # Save checkpoint every 10 batches
+                if batch_num % 10 == 0:
+                    checkpoint.save(ids)
+
             except Exception as e:
-                failed += len(batch_ids)
-                print(f"❌ Final batch failed: {e}", flush=True)
-                checkpoint.save([], batch_ids)
+                failed += len(all_ids)
+                print(f"❌ Batch {batch_num} failed after {args.max_retries} retries: {e}", flush=True)
+                checkpoint.save([], all_ids)  # Save failed IDs
+
+            text_to_ids.clear()
+            pending_texts, pending_tokens = [], 0
+            rows_buffered = 0
+
+            # Every buffered id is written (or recorded as failed) by this
+            # point, so vectors past the cap can go; dicts iterate in
+            # insertion order and cache hits re-insert, so the front of the
+            # dict is least recently used
+            while len(text_to_vec) > DEDUP_CACHE_MAX:
+                del text_to_vec[next(iter(text_to_vec))]
+
+            if batch_num % args.progress_interval == 0:
+                print_progress(processed, total, start, failed)
+
+        # Reader thread streams row chunks into a bounded queue so DB read
+        # I/O overlaps the embedding HTTP calls and DB writes.
+        row_queue: queue.Queue = queue.Queue(maxsize=4)
+        _SENTINEL = None
+        reader_error: List[BaseException] = []
+
+        # Full unbounded backfills on large tables take the binary COPY
+        # read path; everything else uses the named-cursor stream.
+        if args.max_rows == 0 and total > COPY_READ_THRESHOLD:
+            row_source = stream_rows_copy(
+                conn_read, schema, table, pk, pk_type, text_cols, embedding_col, skip_processed
+            )
+        else:
+            row_source = stream_rows(
+                conn_read,
+                schema,
+                table,
+                pk,
+                text_cols,
+                embedding_col,
+                args.max_rows,
+                args.fetch_size,
+                skip_processed,
+            )
+
+        def reader():
+            chunk: List[Tuple] = []
+            try:
+                for item in row_source:
+                    chunk.append(item)
+                    if len(chunk) >= args.fetch_size:
+                        row_queue.put(chunk)
+                        chunk = []
+                if chunk:
+                    row_queue.put(chunk)
+            except BaseException as e:
+                reader_error.append(e)
+            finally:
+                row_queue.put(_SENTINEL)
+
+        reader_thread = threading.Thread(target=reader, name="db-reader", daemon=True)
+        reader_thread.start()
+
+        def iter_rows():
+            while True:
+                chunk = row_queue.get()
+                if chunk is _SENTINEL:
+                    break
+                for item in chunk:
+                    yield item
+
+        for rid, text in iter_rows():
+            text_to_ids[text].append(rid)
+            rows_buffered += 1
+
+            if len(text_to_ids[text]) > 1:
+                deduped += 1
+            elif text in text_to_vec:
+                deduped += 1
+                # Re-insert on hit so hot texts sit at the back of the
+                # dict and survive the LRU eviction in flush_batch
+                text_to_vec[text] = text_to_vec.pop(text)
+            else:
+                # First sighting this run: queue for embedding
+                pending_texts.append(text)
+                pending_tokens += count_tokens(text)
+
+            # Flush on token budget or OpenAI's per-request input cap; the
+            # row cap bounds buffered ids when most texts hit the cache
+            if (
+                pending_tokens >= args.max_batch_tokens
+                or len(pending_texts) >= aimd["size"]
+                or rows_buffered >= 10 * OPENAI_MAX_BATCH_INPUTS
+            ):
+                flush_batch()
+
+        # Flush remainder
+        flush_batch()
+
+        reader_thread.join()
+        if reader_error:
+            raise reader_error[0]
 
         print_progress(processed, total, start, failed)
+        if deduped:
+            print(
+                f"♻️  Deduplicated {deduped:,} rows sharing identical text "
+                f"({unique_embedded:,} unique embeddings fetched)",
+                flush=True,
+            )
         
         if failed == 0:
             print("✅ All done! Clearing checkpoint.", flush=True)
@@ -464,7 +1000,9 @@ def main():
         print(f"❌ Fatal error: {e}", file=sys.stderr)
         raise
     finally:
-        conn.close()  # ✅ FIXED: Was incomplete "conn.c"
+        checkpoint.flush()
+        conn_read.close()
+        conn_write.close()
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,35 @@
 import os
+import io
 import sys
 import csv
+import mmap
+import hashlib
+import time
+import random
+import socket
 import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import shutil
+
 import paramiko
+import paramiko.sftp_file
 from supabase import create_client, Client
 
+# OpenSSH caps SFTP replies at 32KB; larger requests get short replies,
+# which silently collapses prefetch back to sequential reads. Pin the
+# request size to the spec-safe max so pipelining stays effective.
+paramiko.sftp_file.SFTPFile.MAX_REQUEST_SIZE = 32768
+
+# pandas is optional: vectorized CSV parsing with a csv-module fallback
+try:
+    import pandas as pd
+    _HAS_PANDAS = True
+except Exception:
+    _HAS_PANDAS = False
+
 # ---------------------------------------------------------
 # CONFIG
 # ---------------------------------------------------------
@@ -19,6 +44,10 @@ SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 REMOTE_BASE_PATH = "/metacog/Horizon"
 LOCAL_DOWNLOAD_DIR = "downloads"
 BATCH_SIZE = 1000
+MAX_DOWNLOAD_WORKERS = 8
+MAX_UPLOAD_WORKERS = 6
+MAX_INFLIGHT_BATCHES = 8
+CHUNK_SIZE = 64 * 1024
 
 FILES = {
     "customer_master.csv": {
@@ -35,6 +64,12 @@ FILES = {
     }
 }
 
+# Compile any expected-column lists to frozensets once at import so header
+# validation runs a C-level set difference instead of a Python scan
+for _cfg in FILES.values():
+    if "columns" in _cfg:
+        _cfg["columns"] = frozenset(_cfg["columns"])
+
 # ---------------------------------------------------------
 # LOGGING
 # ---------------------------------------------------------
@@ -55,37 +90,475 @@ def require_env(name: str):
         raise RuntimeError(f"Missing required environment variable: {name}")
     return val
 
-def connect_sftp():
-    transport = paramiko.Transport((SFTP_HOST, 22))
-    transport.connect(username=SFTP_USER, password=SFTP_PASS)
-    sftp = paramiko.SFTPClient.from_transport(transport)
-    return sftp, transport
+# Stagger Transport creation so parallel workers don't hammer the SFTP
+# server with simultaneous auth attempts
+_transport_semaphore = threading.Semaphore(2)
+
+def connect_transport():
+    with _transport_semaphore:
+        # Build the socket ourselves: Nagle off so SFTP ACKs aren't
+        # coalesced, and 32MB kernel buffers so the TCP window — not the
+        # default 64KB — sets the in-flight ceiling on long-RTT links
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 32 * 1024 * 1024)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 32 * 1024 * 1024)
+        sock.connect((SFTP_HOST, 22))
+        # A 128MB SSH window keeps SSH-layer flow control from becoming
+        # the new bottleneck; 32KB packets match the OpenSSH payload cap
+        transport = paramiko.Transport(
+            sock,
+            default_window_size=2 ** 27,
+            default_max_packet_size=32768,
+        )
+        # A mid-transfer rekey is a synchronous key exchange that stalls
+        # every in-flight SFTP request; push the thresholds far beyond
+        # anything this job can hit
+        transport.packetizer.REKEY_BYTES = pow(2, 40)
+        transport.packetizer.REKEY_PACKETS = pow(2, 40)
+        # CSV compresses 5-10x, so on a bandwidth-limited link zlib
+        # compression multiplies effective throughput by roughly that ratio
+        transport.use_compression(True)
+        transport.connect(username=SFTP_USER, password=SFTP_PASS)
+    return transport
+
+class SftpPool:
+    """
+    One shared SSH transport per (host, user); callers get per-file SFTP
+    channels multiplexed over it. Opening a channel is a couple of SSH
+    messages, while a fresh transport costs a TCP handshake, key exchange
+    and auth — so concurrent downloads share the expensive part and only
+    the cheap part is per-file. main() drains the pool when its transfer
+    phase ends, successful or not.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._transports = {}  # (host, user) -> Transport
+
+    def _shared_transport(self):
+        key = (SFTP_HOST, SFTP_USER)
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is None or not transport.is_active():
+                transport = connect_transport()
+                self._transports[key] = transport
+            return transport
+
+    def get(self):
+        transport = self._shared_transport()
+        return paramiko.SFTPClient.from_transport(transport), transport
+
+    @contextmanager
+    def borrow(self):
+        """
+        Check a channel out for the duration of a with-block. A clean
+        exit releases it; EOFError, timeouts and other SSH/socket errors
+        discard it so the next borrow() reconnects on a fresh transport.
+        """
+        conn = self.get()
+        try:
+            yield conn[0]
+        except BaseException:
+            self.discard(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def release(self, conn):
+        sftp, _ = conn
+        try:
+            sftp.close()
+        except Exception:
+            pass
+
+    def discard(self, conn):
+        """Close a channel that hit an SSH/socket error; if the transport
+        itself died, drop it so the next get() reconnects."""
+        sftp, transport = conn
+        try:
+            sftp.close()
+        except Exception:
+            pass
+        if not transport.is_active():
+            with self._lock:
+                self._transports = {
+                    k: t for k, t in self._transports.items() if t is not transport
+                }
+            try:
+                transport.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        with self._lock:
+            transports = list(self._transports.values())
+            self._transports.clear()
+        for transport in transports:
+            try:
+                transport.close()
+            except Exception:
+                pass
+
+_sftp_pool = SftpPool()
+
+def validate_header_bytes(source, expected_columns, filename: str):
+    """
+    Validate a CSV header from the first downloaded block, so a broken
+    file fails before the rest of it transfers and no post-download
+    re-open is needed. source may be that block (bytes), a BytesIO, or a
+    local path for files that are already on disk. expected_columns (a
+    FILES "columns" entry) is optional; without it only structural
+    checks run.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        first_kib = bytes(source)
+    elif isinstance(source, io.BytesIO):
+        first_kib = source.getvalue()
+    else:
+        # mmap + demand paging: only the first page actually comes off
+        # disk, with none of buffered I/O's read-ahead
+        with open(source, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                nl = mm.find(b"\n", 0, 65536)
+                first_kib = mm[: nl if nl != -1 else 65536]
+    # Plain bytes split is microseconds where csv.reader is milliseconds;
+    # the Horizon headers are unquoted, so the csv module is only needed
+    # if a quote ever shows up
+    header_line = first_kib.split(b"\n", 1)[0].rstrip(b"\r")
+    if b'"' in header_line:
+        header = next(csv.reader(io.StringIO(header_line.decode("utf-8", errors="replace"))))
+    else:
+        header = header_line.decode("utf-8", errors="replace").split(",")
+
+    if not header or all(not c.strip() for c in header):
+        raise ValueError(f"{filename}: empty CSV header")
+    header_set = frozenset(header)
+    if len(header_set) != len(header):
+        raise ValueError(f"{filename}: duplicate column names in header")
+    if expected_columns:
+        # Set difference keeps the check O(E+H) instead of O(E*H)
+        missing = frozenset(expected_columns) - header_set
+        if missing:
+            raise ValueError(
+                f"{filename}: missing expected columns: {sorted(missing)}"
+            )
+
+class _Prog:
+    """
+    Shared transfer state between the copy loop and its observer threads.
+    __slots__ skips the per-instance __dict__, so the loop's update is a
+    fixed-offset attribute store instead of a hashed dict access.
+    """
+
+    __slots__ = ("done", "stop", "stalled")
+
+    def __init__(self):
+        self.done = 0
+        self.stop = False
+        self.stalled = False
+
+def start_progress_ticker(filename: str, total: int, state: _Prog, interval: float = 2.0):
+    """
+    Log transfer progress from a daemon thread on its own clock. The copy
+    loop only bumps state.done — all percentage/rate math and string
+    formatting happen here, off the hot path.
+    """
+    started = time.monotonic()
+
+    def ticker():
+        while not state.stop:
+            time.sleep(interval)
+            if state.stop:
+                break
+            done = state.done
+            pct = (done / total * 100) if total else 0.0
+            rate = done / max(time.monotonic() - started, 1e-9) / (1024 * 1024)
+            logger.info(
+                f"{filename}: {done:,}/{total:,} bytes ({pct:.1f}%, {rate:.1f} MB/s)"
+            )
+
+    thread = threading.Thread(target=ticker, daemon=True)
+    thread.start()
+    return thread
+
+def start_stall_watchdog(filename: str, state: _Prog, remote_file, interval: float = 20.0):
+    """
+    Fail fast on a silently stalled transfer. A dead session can dribble
+    bytes or block far short of the socket timeout; if the counter hasn't
+    advanced for a full interval, mark the transfer stalled and force the
+    remote handle closed so the blocked read() wakes up. The outer retry
+    then gets a fresh connection in seconds instead of minutes.
+    """
 
-def clean_row(row: dict) -> dict:
-    """Convert empty strings to None for Supabase"""
-    return {k.lower().replace(" ", "_"): (v if v != "" else None) for k, v in row.items()}
+    def watchdog():
+        last = -1
+        while not state.stop:
+            time.sleep(interval)
+            if state.stop:
+                break
+            if state.done == last:
+                state.stalled = True
+                logger.warning(f"{filename}: no progress for {interval:.0f}s, aborting transfer")
+                try:
+                    remote_file.close()
+                except Exception:
+                    pass
+                return
+            last = state.done
+
+    thread = threading.Thread(target=watchdog, daemon=True)
+    thread.start()
+    return thread
+
+def download_one(filename: str, attrs):
+    """
+    Download one file over its own SFTP channel; returns
+    (local_path, bytes_transferred). attrs is the SFTPAttributes entry
+    from the single listdir_attr call in main(), so no per-file stat
+    round-trip is needed.
+    """
+    with _sftp_pool.borrow() as sftp:
+        remote_path = f"{REMOTE_BASE_PATH}/{filename}"
+        local_path = os.path.join(LOCAL_DOWNLOAD_DIR, filename)
+
+        expected_columns = FILES[filename].get("columns")
+
+        # Comparing against the listing is free and skips files the last
+        # run already fetched; one os.stat covers existence, size and mtime
+        try:
+            local_stat = os.stat(local_path)
+        except FileNotFoundError:
+            local_stat = None
+        if (
+            local_stat is not None
+            and local_stat.st_size == attrs.st_size
+            and int(local_stat.st_mtime) == int(attrs.st_mtime)
+        ):
+            logger.info(f"{filename}: unchanged on remote, skipping download")
+            return local_path, attrs.st_size
+
+        logger.info(f"Downloading {filename}")
+        total_size = attrs.st_size
+        started = time.monotonic()
+        state = _Prog()
+        # Bounded prefetch pipelines reads instead of waiting one RTT per
+        # 32KB block; unbounded prefetch can hang paramiko on big files.
+        # The 4MB write buffer amortizes local write() syscalls.
+        with sftp.open(remote_path, "rb") as remote_file:
+            # Below ~2MB the setup cost of 64 async requests outweighs the
+            # pipelining win — plain reads finish in a handful of RTTs
+            if total_size >= 2 * 1024 * 1024:
+                remote_file.prefetch(total_size, max_concurrent_requests=64)
+
+            # The header always sits in the first block: validate it
+            # before the rest of the file transfers
+            chunk = remote_file.read(CHUNK_SIZE)
+            validate_header_bytes(chunk, expected_columns, filename)
+
+            # Per-chunk tracing only when DEBUG is on: isEnabledFor is
+            # checked once outside the loop and %-style args defer
+            # formatting, so the copy loop pays nothing at INFO level
+            trace = logger.isEnabledFor(logging.DEBUG)
+            transferred = 0
+            chunk_count = 0
+            # Hash inline while bytes stream past: OpenSSL's SHA-NI path
+            # runs at memory bandwidth, so this rides along for free
+            # compared to the network and saves a full re-read
+            digest = hashlib.sha256()
+            start_progress_ticker(filename, total_size, state)
+            start_stall_watchdog(filename, state, remote_file)
+            try:
+                with open(local_path, "wb", buffering=4 * 1024 * 1024) as fp:
+                    # Tell the kernel this is a straight streaming write so
+                    # it tunes write-back for sequential access
+                    if hasattr(os, "posix_fadvise"):
+                        try:
+                            os.posix_fadvise(
+                                fp.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL
+                            )
+                        except OSError:
+                            pass
+                    while chunk:
+                        # memoryview hands the writer a zero-copy view of
+                        # the chunk; the 4MB buffer batches the actual
+                        # write() syscalls
+                        fp.write(memoryview(chunk))
+                        digest.update(chunk)
+                        transferred += len(chunk)
+                        state.done = transferred
+                        chunk_count += 1
+                        if trace:
+                            logger.debug(
+                                "%s: chunk %d (%d bytes, %d transferred)",
+                                filename, chunk_count, len(chunk), transferred,
+                            )
+                        chunk = remote_file.read(CHUNK_SIZE)
+
+                    # The file is re-read once by the upload step and never
+                    # again — tell the kernel not to let it evict hotter page
+                    # cache (Linux only; advisory, so failures don't matter).
+                    # DONTNEED drops clean pages only, so sync the data to
+                    # disk first or the just-written pages stay dirty and
+                    # the advice is a no-op
+                    if hasattr(os, "posix_fadvise"):
+                        fp.flush()
+                        try:
+                            os.fdatasync(fp.fileno())
+                            os.posix_fadvise(fp.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+                        except OSError:
+                            pass
+            finally:
+                state.stop = True
+
+            if state.stalled:
+                raise IOError(f"{filename}: transfer stalled, aborted by watchdog")
+
+        # The listing already told us the size — a short read here means a
+        # truncated transfer, so fail instead of uploading a partial file
+        if transferred != total_size:
+            raise IOError(
+                f"{filename}: downloaded {transferred:,} bytes, expected {total_size:,}"
+            )
+
+        # Store the checksum next to the file so downstream consumers can
+        # cross-check without re-reading 70MB of CSV
+        sha256 = digest.hexdigest()
+        with open(local_path + ".sha256", "w", encoding="utf-8") as hf:
+            hf.write(f"{sha256}  {filename}\n")
+
+        # Stamp the remote mtime on the local copy so the next run's
+        # size+mtime comparison can match exactly
+        os.utime(local_path, (attrs.st_atime, attrs.st_mtime))
+
+        elapsed = time.monotonic() - started
+        rate = transferred / max(elapsed, 1e-9) / (1024 * 1024)
+        logger.info(
+            f"Downloaded {filename} ({transferred:,} bytes, {rate:.1f} MB/s, sha256={sha256})"
+        )
+        return local_path, transferred
+
+def _mirror_file(src_path: str, dst_fd: int):
+    """
+    Copy a downloaded file to an open destination descriptor (e.g. a blob
+    upload staging fd). Uses os.sendfile on Linux — a kernel zero-copy
+    path that never touches user space — and a large-buffer
+    shutil.copyfileobj elsewhere.
+    """
+    with open(src_path, "rb") as src:
+        if hasattr(os, "sendfile"):
+            offset = 0
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining:
+                sent = os.sendfile(dst_fd, src.fileno(), offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+        else:
+            with os.fdopen(os.dup(dst_fd), "wb") as dst:
+                shutil.copyfileobj(src, dst, length=16 * 1024 * 1024)
+
+def download_with_retry(filename: str, attrs, max_attempts: int = 3):
+    """
+    Retry a download on transient SSH/socket errors. The pool discards
+    the broken connection, so each attempt gets a fresh channel without
+    restarting the whole run.
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return download_one(filename, attrs)
+        except (paramiko.SSHException, OSError) as exc:
+            if attempt == max_attempts:
+                raise
+            # Exponential backoff with jitter: fixed delays synchronize
+            # retries across workers and hammer an already-struggling server
+            delay = min(60.0, 2 ** attempt) + random.uniform(0, min(10.0, 2 ** attempt))
+            logger.warning(
+                f"{filename}: attempt {attempt} failed ({exc}), retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+def translate_columns(raw_cols) -> list:
+    """Rename columns once per file instead of once per row"""
+    return [c.lower().replace(" ", "_") for c in raw_cols]
 
 # ---------------------------------------------------------
 # SUPABASE
 # ---------------------------------------------------------
 
+def iter_row_batches(csv_path: str):
+    """Yield lists of cleaned row dicts, BATCH_SIZE rows at a time."""
+    if _HAS_PANDAS:
+        # C-level vectorized parse, typically 10-50x faster than looping
+        # Python's csv module over millions of rows
+        chunks = pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=BATCH_SIZE)
+        for df in chunks:
+            df.columns = translate_columns(df.columns)
+            df = df.where(df != "", None)
+            yield df.to_dict(orient="records")
+    else:
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            # csv.reader skips DictReader's per-row dict construction; rows
+            # come back as lists and zip against the translated header.
+            # Column names repeat on every row — translate them once here
+            # rather than running lower()/replace() per field per row
+            reader = csv.reader(f)
+            new_cols = translate_columns(next(reader))
+            batch = []
+            for row in reader:
+                batch.append(dict(zip(new_cols, (v or None for v in row))))
+                if len(batch) == BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
 def upload_csv_to_supabase(supabase: Client, table: str, csv_path: str):
+    """
+    Stream batches straight from the CSV to Supabase: memory stays at
+    O(BATCH_SIZE) and the first HTTP request goes out after 1000 rows
+    instead of after the whole file has parsed. REST inserts are
+    I/O-bound, so several run concurrently; a semaphore caps in-flight
+    batches to stay inside Supabase rate limits.
+    """
     logger.info(f"Uploading {csv_path} → {table}")
 
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = [clean_row(r) for r in reader]
+    inflight = threading.Semaphore(MAX_INFLIGHT_BATCHES)
 
-    total = len(rows)
-    logger.info(f"{total:,} rows to upload")
+    # supabase.table() builds a fresh query builder per call; construct it
+    # once per file rather than once per batch
+    tbl = supabase.table(table)
 
-    for i in range(0, total, BATCH_SIZE):
-        batch = rows[i:i + BATCH_SIZE]
-        supabase.table(table).insert(batch).execute()
+    # Streaming means the row total isn't known up front; log a running
+    # count every 10 completed batches instead of a "N rows to upload"
+    # preamble. Counting happens in the workers as each insert lands, so
+    # progress shows up while the file is still uploading
+    progress_lock = threading.Lock()
+    progress = [0, 0]  # rows landed, batches landed
 
-        uploaded = min(i + BATCH_SIZE, total)
-        pct = (uploaded / total) * 100
-        logger.info(f"{table}: {uploaded:,}/{total:,} ({pct:.1f}%)")
+    def insert(batch):
+        try:
+            tbl.insert(batch).execute()
+        finally:
+            inflight.release()
+        with progress_lock:
+            progress[0] += len(batch)
+            progress[1] += 1
+            if progress[1] % 10 == 0:
+                logger.info(f"{table}: {progress[0]:,} rows uploaded")
+        return len(batch)
+
+    uploaded = 0
+    futures = []
+    with ThreadPoolExecutor(max_workers=MAX_UPLOAD_WORKERS) as pool:
+        for batch in iter_row_batches(csv_path):
+            inflight.acquire()
+            futures.append(pool.submit(insert, batch))
+        for future in as_completed(futures):
+            uploaded += future.result()
+
+    logger.info(f"{table}: done, {uploaded:,} rows uploaded")
 
 # ---------------------------------------------------------
 # MAIN
@@ -102,34 +575,80 @@ def main():
 
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-    logger.info("Connecting to SFTP...")
-    sftp, transport = connect_sftp()
-
-    try:
-        for filename, cfg in FILES.items():
-            remote_path = f"{REMOTE_BASE_PATH}/{filename}"
-            local_path = os.path.join(LOCAL_DOWNLOAD_DIR, filename)
+    # One listing supplies name/size/mtime for every file — no per-file
+    # stat round-trips later
+    logger.info("Listing remote directory...")
+    with _sftp_pool.borrow() as sftp:
+        attrs_by_name = {a.filename: a for a in sftp.listdir_attr(REMOTE_BASE_PATH)}
 
-            logger.info(f"Downloading {filename}")
-            sftp.get(remote_path, local_path)
+    missing_remote = [f for f in FILES if f not in attrs_by_name]
+    if missing_remote:
+        raise FileNotFoundError(
+            f"Not found in {REMOTE_BASE_PATH}: {', '.join(missing_remote)}"
+        )
 
-            size = os.path.getsize(local_path)
-            logger.info(f"Downloaded {filename} ({size:,} bytes)")
+    # Streamed downloads validate their header from the first block, but
+    # files skipped as unchanged never re-check the copy on disk. A small
+    # separate executor re-validates each file as its download future
+    # completes, so the work hides behind the remaining downloads instead
+    # of competing with them for I/O threads
+    validate_pool = ThreadPoolExecutor(max_workers=2)
+    validation_futures = []
+    validation_lock = threading.Lock()
 
-            upload_csv_to_supabase(
-                supabase=supabase,
-                table=cfg["table"],
-                csv_path=local_path
+    def queue_validation(future, filename):
+        if future.exception() is not None:
+            return  # the download error propagates via future.result() below
+        local_path, _ = future.result()
+        expected = FILES[filename].get("columns")
+        with validation_lock:
+            validation_futures.append(
+                validate_pool.submit(validate_header_bytes, local_path, expected, filename)
             )
 
-        logger.info("✅ Horizon SFTP → Supabase pipeline completed")
+    # Downloads are network-bound: run one SFTP channel per file over the
+    # shared transport so total wall time approaches max(latencies)
+    # instead of their sum
+    logger.info("Downloading files from SFTP...")
+    try:
+        with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(FILES))) as pool:
+            futures = {}
+            for filename in FILES:
+                future = pool.submit(download_with_retry, filename, attrs_by_name[filename])
+                future.add_done_callback(
+                    lambda f, filename=filename: queue_validation(f, filename)
+                )
+                futures[future] = filename
+            # Byte counts come back from the downloads themselves — no
+            # post-transfer stat() per file — and get logged as one summary
+            results = []
+            for future in as_completed(futures):
+                _, transferred = future.result()  # propagate download errors
+                results.append((futures[future], transferred))
 
+        # Surface any validation failure before uploads start
+        for vf in validation_futures:
+            vf.result()
     finally:
-        try:
-            sftp.close()
-            transport.close()
-        except Exception:
-            pass
+        # Tear the transport down even when a download or validation
+        # raises, so a failed run doesn't leak its SSH reader thread
+        _sftp_pool.close_all()
+        validate_pool.shutdown(wait=False)
+
+    logger.info(
+        "Transfer summary:\n"
+        + "\n".join(f"  {name}: {size:,} B" for name, size in sorted(results))
+    )
+
+    for filename, cfg in FILES.items():
+        local_path = os.path.join(LOCAL_DOWNLOAD_DIR, filename)
+        upload_csv_to_supabase(
+            supabase=supabase,
+            table=cfg["table"],
+            csv_path=local_path
+        )
+
+    logger.info("✅ Horizon SFTP → Supabase pipeline completed")
 
 # ---------------------------------------------------------
 # ENTRYPOINT